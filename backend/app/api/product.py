@@ -12,9 +12,10 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, HTTPException
+import msgspec
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 
 from app.services.scraper.manager import search_all
@@ -22,6 +23,21 @@ from app.services.scraper.manager import search_all
 router = APIRouter(prefix="")
 logger = logging.getLogger("uvicorn.error")
 
+
+class MsgspecJSONResponse(Response):
+    """
+    JSON response rendered with msgspec.json.encode.
+
+    Routes return an instance directly, so FastAPI skips jsonable_encoder and
+    response_model validation entirely.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return msgspec.json.encode(content)
+
+
 # --------------------------------------------------------------------------
 # Schemas
 # --------------------------------------------------------------------------
@@ -31,7 +47,10 @@ class ProductSearchRequest(BaseModel):
     max_results: int = Field(6, ge=1, le=50)
 
 
-class ProductItem(BaseModel):
+# Response schemas are msgspec Structs: built from already-normalized scraper
+# output and encoded straight to JSON, bypassing Pydantic validation/serialization.
+
+class ProductItem(msgspec.Struct, kw_only=True):
     title: str
     price_raw: Optional[str] = None
     price: Optional[float] = None
@@ -42,11 +61,12 @@ class ProductItem(BaseModel):
     is_recommended: Optional[bool] = False
 
 
-
-class ProductSearchResponse(BaseModel):
+class ProductSearchResponse(msgspec.Struct):
     query: str
     total_results: int
     products: List[ProductItem]
+    # Sources that failed or timed out; the frontend can flag results as incomplete.
+    partial_sources: List[str] = []
 
 
 SCRAPER_TIMEOUT = 30.0
@@ -55,8 +75,8 @@ SCRAPER_TIMEOUT = 30.0
 # MAIN PRODUCT SEARCH
 # --------------------------------------------------------------------------
 
-@router.post("/", response_model=ProductSearchResponse)
-async def search_products(payload: ProductSearchRequest):
+@router.post("/", response_class=MsgspecJSONResponse)
+async def search_products(payload: ProductSearchRequest, request: Request):
     """
     Smart product search:
     - Calls unified manager
@@ -71,9 +91,9 @@ async def search_products(payload: ProductSearchRequest):
 
     try:
         results = await asyncio.wait_for(
-            asyncio.to_thread(
-                search_all,
+            search_all(
                 payload.query,
+                request.app.state.http_session,
                 payload.max_results,
             ),
             timeout=SCRAPER_TIMEOUT,
@@ -93,33 +113,49 @@ async def search_products(payload: ProductSearchRequest):
             detail="Search failed due to an internal error.",
         )
 
-    if not isinstance(results, list):
+    if not isinstance(results.products, list):
         logger.error("Unexpected result format: %r", results)
         raise HTTPException(
             status_code=500,
             detail="Unexpected search output format.",
         )
 
+    # Scraper output is already normalized, so skip re-validation; only the
+    # request payload (untrusted input) goes through full Pydantic validation.
     try:
-        products = [ProductItem(**item) for item in results]
+        products = [
+            ProductItem(
+                title=item.title,
+                price_raw=item.price_raw,
+                price=item.price,
+                link=item.link,
+                image=item.image,
+                rating=item.rating,
+                source=item.source,
+                is_recommended=item.is_recommended,
+            )
+            for item in results.products
+        ]
     except Exception as exc:
-        logger.exception("Response validation failed: %s", exc)
+        logger.exception("Response construction failed: %s", exc)
         raise HTTPException(
             status_code=500,
             detail="Failed to parse search results.",
         )
 
-    return ProductSearchResponse(
+    resp = ProductSearchResponse(
         query=payload.query,
         total_results=len(products),
         products=products,
+        partial_sources=results.partial_sources,
     )
+    return MsgspecJSONResponse(resp)
 
 # --------------------------------------------------------------------------
 # MOCK ENDPOINT (DEV / DEMO)
 # --------------------------------------------------------------------------
 
-@router.post("/mock", response_model=ProductSearchResponse)
+@router.post("/mock", response_class=MsgspecJSONResponse)
 async def mock_search(payload: ProductSearchRequest):
     mock_items = [
         ProductItem(
@@ -144,8 +180,9 @@ async def mock_search(payload: ProductSearchRequest):
 
     items = mock_items[: payload.max_results]
 
-    return ProductSearchResponse(
+    resp = ProductSearchResponse(
         query=payload.query,
         total_results=len(items),
         products=items,
     )
+    return MsgspecJSONResponse(resp)
@@ -1,28 +1,113 @@
 # backend/app/services/scraper/google_shopping_scraper.py
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-import time
+from typing import List, Optional
+import asyncio
 import logging
 
-from dotenv import load_dotenv, find_dotenv
-from serpapi import GoogleSearch
+import aiohttp
+import msgspec
+from aiohttp_retry import ExponentialRetry, RetryClient
 
-load_dotenv(find_dotenv())
+from .models import Candidate
 
 logger = logging.getLogger(__name__)
 
+SERPAPI_URL = "https://serpapi.com/search"
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10)
 RETRIES = 2
-RETRY_SLEEP = 1.0
 
-
-def _fetch_google_shopping(
+# Retry transient failures only (rate limits, 5xx, network errors); 4xx such as
+# a bad API key fail immediately. Backoff starts at 1s.
+_RETRY_OPTIONS = ExponentialRetry(
+    attempts=RETRIES,
+    start_timeout=0.5,
+    statuses={429, 500, 502, 503, 504},
+    exceptions={aiohttp.ClientError, asyncio.TimeoutError},
+)
+
+
+# Per-attempt failures, reported through an aiohttp trace hook on the shared
+# session (see main.py). Only the status code or exception type is logged:
+# the request URL, and aiohttp's error messages that embed it, carry the api_key.
+_TRACE_TAG = "google_shopping"
+
+
+async def _on_request_end(session, ctx, params: aiohttp.TraceRequestEndParams) -> None:
+    trace_ctx = ctx.trace_request_ctx or {}
+    if trace_ctx.get("source") == _TRACE_TAG and params.response.status >= 400:
+        logger.warning(
+            "google_shopping attempt %d/%d failed: HTTP %d",
+            trace_ctx.get("current_attempt", 1),
+            RETRIES,
+            params.response.status,
+        )
+
+
+async def _on_request_exception(session, ctx, params: aiohttp.TraceRequestExceptionParams) -> None:
+    trace_ctx = ctx.trace_request_ctx or {}
+    # Cancellation comes from the caller's deadline, which it reports itself.
+    if trace_ctx.get("source") == _TRACE_TAG and not isinstance(
+        params.exception, asyncio.CancelledError
+    ):
+        logger.warning(
+            "google_shopping attempt %d/%d failed: %s",
+            trace_ctx.get("current_attempt", 1),
+            RETRIES,
+            type(params.exception).__name__,
+        )
+
+
+TRACE_CONFIG = aiohttp.TraceConfig()
+TRACE_CONFIG.on_request_end.append(_on_request_end)
+TRACE_CONFIG.on_request_exception.append(_on_request_exception)
+
+# Worst case for one search: every attempt runs to the per-attempt timeout,
+# plus the backoff sleeps between them. Callers wrapping the fetch in their
+# own deadline must allow at least this much or the retries never run.
+MAX_FETCH_SECONDS = RETRIES * REQUEST_TIMEOUT.total + sum(
+    _RETRY_OPTIONS.get_timeout(attempt) for attempt in range(1, RETRIES)
+)
+
+
+# Only the fields read by _normalize_shopping_item; everything else in the
+# SerpAPI payload is skipped by the decoder.
+class ShoppingResult(msgspec.Struct):
+    title: Optional[str] = None
+    price: Optional[str] = None
+    displayed_price: Optional[str] = None
+    extracted_price: Optional[float] = None
+    product_link: Optional[str] = None
+    link: Optional[str] = None
+    thumbnail: Optional[str] = None
+    serpapi_thumbnail: Optional[str] = None
+    rating: Optional[float] = None
+    merchant: Optional[str] = None
+    source: Optional[str] = None
+
+
+class ShoppingResponse(msgspec.Struct):
+    # Items stay raw so one malformed result is skipped instead of failing the page.
+    shopping_results: List[msgspec.Raw] = []
+    error: Optional[str] = None
+
+
+_RESPONSE_DECODER = msgspec.json.Decoder(ShoppingResponse)
+# strict=False keeps the old float() leniency: "4.5" or "1299" still decode.
+_RESULT_DECODER = msgspec.json.Decoder(ShoppingResult, strict=False)
+
+
+async def _fetch_google_shopping(
+    session: aiohttp.ClientSession,
     api_key: str,
     query: str,
     gl: str = "in",
     hl: str = "en",
     location: Optional[str] = None,
-) -> Dict[str, Any]:
+) -> ShoppingResponse:
+    if not api_key:
+        raise RuntimeError("SERPAPI_KEY is not configured")
+
     params = {
         "engine": "google_shopping",
         "q": query,
@@ -35,41 +120,44 @@ def _fetch_google_shopping(
         params["location_requested"] = location
         params["location_used"] = location
 
-    last_exc = None
-    for attempt in range(1, RETRIES + 1):
-        try:
-            search = GoogleSearch(params)
-            data = search.get_dict()
-            return data if isinstance(data, dict) else {}
-        except Exception as exc:
-            last_exc = exc
-            logger.warning("google_shopping attempt %d failed: %s", attempt, exc)
-            time.sleep(RETRY_SLEEP * attempt)
-
-    raise RuntimeError("google_shopping request failed") from last_exc
-
-
-def _normalize_shopping_item(item: Dict[str, Any]) -> Dict[str, Any]:
-    return {
-        "title": item.get("title"),
-        "price_raw": item.get("price") or item.get("displayed_price"),
-        "price": float(item["extracted_price"]) if item.get("extracted_price") is not None else None,
-        "link": item.get("product_link") or item.get("link"),
-        "image": item.get("thumbnail") or item.get("serpapi_thumbnail"),
-        "rating": float(item["rating"]) if item.get("rating") is not None else None,
-        "source": item.get("merchant") or item.get("source") or "Google Shopping",
-    }
+    client = RetryClient(client_session=session, retry_options=_RETRY_OPTIONS)
+    async with client.get(
+        SERPAPI_URL,
+        params=params,
+        timeout=REQUEST_TIMEOUT,
+        trace_request_ctx={"source": _TRACE_TAG},
+    ) as resp:
+        if resp.status >= 400:
+            # Not raise_for_status(): its error carries the request URL, and
+            # with it the api_key, into every log line that reports it.
+            raise RuntimeError(f"SerpAPI returned HTTP {resp.status} {resp.reason}")
+        body = await resp.read()
+    return _RESPONSE_DECODER.decode(body)
+
+
+def _normalize_shopping_item(item: ShoppingResult) -> Candidate:
+    return Candidate(
+        title=item.title or "",
+        price_raw=item.price or item.displayed_price,
+        price=item.extracted_price,
+        link=item.product_link or item.link,
+        image=item.thumbnail or item.serpapi_thumbnail,
+        rating=item.rating,
+        source=item.merchant or item.source or "Google Shopping",
+    )
 
 
-def search_google_shopping(
+async def search_google_shopping(
+    session: aiohttp.ClientSession,
     api_key: str,
     query: str,
     max_results: int = 10,
     gl: str = "in",
     hl: str = "en",
     location: Optional[str] = None,
-) -> List[Dict[str, Any]]:
-    raw = _fetch_google_shopping(
+) -> List[Candidate]:
+    raw = await _fetch_google_shopping(
+        session,
         api_key=api_key,
         query=query,
         gl=gl,
@@ -77,12 +165,14 @@ def search_google_shopping(
         location=location,
     )
 
-    results = raw.get("shopping_results") or []
-    products: List[Dict[str, Any]] = []
+    if raw.error:
+        logger.warning("google_shopping returned an error: %s", raw.error)
+
+    products: List[Candidate] = []
 
-    for item in results:
+    for item in raw.shopping_results:
         try:
-            products.append(_normalize_shopping_item(item))
+            products.append(_normalize_shopping_item(_RESULT_DECODER.decode(item)))
             if len(products) >= max_results:
                 break
         except Exception:
@@ -1,39 +1,213 @@
 # backend/app/services/scraper/manager.py
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import itertools
 import os
-import time
 import math
 import logging
-from typing import Dict, List, Optional, Tuple
+import re
+import time
+from typing import Awaitable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
+import aiohttp
+import msgspec
+import numpy as np
+import redis.asyncio as redis
+from cachetools import TTLCache
 from dotenv import load_dotenv, find_dotenv
-from .google_shopping_scraper import search_google_shopping
+from . import semantic_cache
+from .google_shopping_scraper import MAX_FETCH_SECONDS, search_google_shopping
+from .models import Candidate, SearchResult
 
 load_dotenv(find_dotenv())
 logger = logging.getLogger(__name__)
 
+# Read once at import; .env is loaded above.
+_DEFAULT_API_KEY = os.getenv("SERPAPI_KEY")
+
 # ------------------------------------------------------------------
-# Simple in-memory cache (DEV friendly)
+# Cache: per-process L1 (size-capped TTL) + optional shared Redis L2,
+# with in-flight request coalescing
 # ------------------------------------------------------------------
 
-_CACHE: Dict[str, Tuple[float, List[Dict]]] = {}
 CACHE_TTL_SECONDS = 60
+CACHE_MAX_ENTRIES = 1024
+
+# Shared across uvicorn workers when set. Configure the Redis server with
+# `maxmemory-policy allkeys-lfu` so hot queries survive memory pressure.
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_KEY_PREFIX = "shopfusion:search:"
+
+# With Redis behind it, L1 only needs to absorb bursts without a round-trip.
+L1_CACHE_TTL_SECONDS = 10 if REDIS_URL else CACHE_TTL_SECONDS
+
+# L2 sits on every miss, so a Redis that stops answering must cost a fraction
+# of a second, not the client default (no timeout on redis<8).
+REDIS_SOCKET_TIMEOUT = 0.25
+
+_CACHE: TTLCache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=L1_CACHE_TTL_SECONDS)
+_REDIS: Optional[redis.Redis] = (
+    redis.from_url(
+        REDIS_URL,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+    )
+    if REDIS_URL
+    else None
+)
+# Pending L2 writes; referenced here so they are not garbage-collected mid-flight.
+_L2_WRITES: Set[asyncio.Task] = set()
 
+# cache_key -> running upstream fetch; concurrent misses for the same key
+# await this one task instead of each hitting SerpAPI.
+_INFLIGHT: Dict[str, asyncio.Task] = {}
 
-def _cache_get(key: str) -> Optional[List[Dict]]:
-    entry = _CACHE.get(key)
-    if not entry:
+_CACHE_STATS = {"hits": 0, "misses": 0, "l2_hits": 0, "semantic_hits": 0, "coalesced": 0}
+
+
+def _cache_get(key: str) -> Optional[List[Candidate]]:
+    value = _CACHE.get(key)
+    if value is None:
+        _CACHE_STATS["misses"] += 1
+    else:
+        _CACHE_STATS["hits"] += 1
+    return value
+
+
+async def _l2_get(key: str) -> Optional[List[Candidate]]:
+    if _REDIS is None:
+        return None
+    try:
+        raw = await _REDIS.get(REDIS_KEY_PREFIX + key)
+    except Exception as exc:
+        logger.warning("redis get failed: %s", exc)
         return None
-    ts, value = entry
-    if time.time() - ts > CACHE_TTL_SECONDS:
-        _CACHE.pop(key, None)
+    if raw is None:
         return None
+    try:
+        value = msgspec.json.decode(raw, type=List[Candidate])
+    except msgspec.MsgspecError as exc:
+        # Stale or incompatible entry (e.g. written before a Candidate schema
+        # change); treat it as a miss and drop it so the next fetch replaces it.
+        logger.warning("dropping undecodable redis entry: %s", exc)
+        try:
+            await _REDIS.delete(REDIS_KEY_PREFIX + key)
+        except Exception:
+            pass
+        return None
+    _CACHE_STATS["l2_hits"] += 1
+    _CACHE[key] = value
     return value
 
 
-def _cache_set(key: str, value: List[Dict]) -> None:
-    _CACHE[key] = (time.time(), value)
+async def _l2_set(key: str, payload: bytes) -> None:
+    try:
+        await _REDIS.setex(REDIS_KEY_PREFIX + key, CACHE_TTL_SECONDS, payload)
+    except Exception as exc:
+        logger.warning("redis set failed: %s", exc)
+
+
+def _cache_set(key: str, value: List[Candidate]) -> None:
+    _CACHE[key] = value
+    if _REDIS is None:
+        return
+    # Encoded now so later mutation of the candidates cannot leak into L2; the
+    # write itself runs in the background, off the response path.
+    task = asyncio.create_task(_l2_set(key, msgspec.json.encode(value)))
+    _L2_WRITES.add(task)
+    task.add_done_callback(_L2_WRITES.discard)
+
+
+def cache_stats() -> Dict[str, int]:
+    return {**_CACHE_STATS, "size": len(_CACHE), "inflight": len(_INFLIGHT)}
+
+
+async def warm_cache() -> None:
+    await semantic_cache.warm_up()
+
+
+async def close_cache() -> None:
+    semantic_cache.close()
+    for task in list(_L2_WRITES):
+        task.cancel()
+    if _REDIS is not None:
+        await _REDIS.aclose()
+
+
+# ------------------------------------------------------------------
+# Upstream sources
+# ------------------------------------------------------------------
+
+# name -> async scraper coroutine function; every enabled source is queried concurrently.
+SOURCES = {
+    "google_shopping": search_google_shopping,
+}
+_SOURCES_DEFAULT = tuple(SOURCES)
+
+# Cap per source so one slow provider cannot hold back the others' results.
+# Sized from the scraper's own retry budget (plus a little slack for decoding)
+# so its retries get to run before the source is given up on.
+PER_SOURCE_TIMEOUT = MAX_FETCH_SECONDS + 1.0
+
+
+def _describe_error(exc: BaseException) -> str:
+    # aiohttp errors can embed the request URL (api_key included), so only the
+    # scrapers' own RuntimeError messages are logged verbatim.
+    if type(exc) is RuntimeError:
+        return str(exc)
+    return type(exc).__name__
+
+
+async def _run_source(name: str, call: Awaitable[List[Candidate]]) -> Optional[List[Candidate]]:
+    """Runs one source under PER_SOURCE_TIMEOUT; logs and returns None on failure."""
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(call, timeout=PER_SOURCE_TIMEOUT)
+    except Exception as exc:
+        elapsed = time.monotonic() - started
+        # asyncio.TimeoutError also covers aiohttp's own connect/read timeouts,
+        # so only a failure at the deadline is reported as our timeout.
+        if isinstance(exc, asyncio.TimeoutError) and elapsed >= PER_SOURCE_TIMEOUT:
+            logger.warning("%s timed out after %.1fs", name, PER_SOURCE_TIMEOUT)
+        else:
+            logger.warning("%s failed after %.1fs: %s", name, elapsed, _describe_error(exc))
+        return None
+
+
+async def _fetch_sources(
+    session: aiohttp.ClientSession,
+    query: str,
+    max_results: int,
+    sources: Iterable[str],
+    api_key: Optional[str],
+) -> Tuple[List[Candidate], List[str]]:
+    """Returns the combined items and the names of sources that failed or timed out."""
+    names = [name for name in sources if name in SOURCES]
+    results = await asyncio.gather(*(
+        _run_source(
+            name,
+            SOURCES[name](
+                session,
+                api_key=api_key,
+                query=query,
+                max_results=max_results,
+            ),
+        )
+        for name in names
+    ))
+
+    raw_items: List[Candidate] = []
+    failed: List[str] = []
+    for name, result in zip(names, results):
+        if result is None:
+            failed.append(name)
+        else:
+            raw_items.extend(result)
+
+    return raw_items, failed
 
 
 # ------------------------------------------------------------------
@@ -59,6 +233,9 @@ SOURCE_TRUST = {
 }
 
 
+# Sources come from a small set of merchant names, so the linear scans below
+# are memoized per distinct input.
+@functools.lru_cache(maxsize=256)
 def _get_trust_score(source: str) -> float:
     if not source:
         return 0.5
@@ -90,6 +267,7 @@ def _is_google_redirect(url: str) -> bool:
     return "google.com/search" in url or "google.com/shopping" in url
 
 
+@functools.lru_cache(maxsize=1024)
 def _build_merchant_search_link(source: str, query: str) -> Optional[str]:
     if not source:
         return None
@@ -104,37 +282,55 @@ def _build_merchant_search_link(source: str, query: str) -> Optional[str]:
 # Filters & scoring
 # ------------------------------------------------------------------
 
+# Above this many candidates, price filtering and sorting run on numpy arrays
+# instead of per-candidate Python loops; below it the array setup costs more.
+NUMPY_THRESHOLD = 64
+
 IGNORE_KEYWORDS = {
     "cover", "case", "charger", "adapter", "cable", "protector",
     "screen guard", "tempered", "back cover", "earphone", "headphone"
 }
 
 
-def _is_irrelevant(title: str) -> bool:
-    title = title.lower()
-    return any(word in title for word in IGNORE_KEYWORDS)
+# One alternation scanned in a single pass instead of a substring search per keyword.
+_IGNORE_RE = re.compile("|".join(re.escape(w) for w in sorted(IGNORE_KEYWORDS, key=len, reverse=True)))
 
 
-def _score_item(item: Dict, query: str) -> float:
-    score = 0.0
-    title = (item.get("title") or "").lower()
-    q_tokens = query.lower().split()
+def _is_irrelevant(title_key: str) -> bool:
+    return _IGNORE_RE.search(title_key) is not None
 
-    for tok in q_tokens:
-        if tok in title:
-            score += 0.25
 
-    if item.get("rating"):
+def _score_item(item: Candidate, q_tokens: FrozenSet[str]) -> float:
+    score = 0.25 * len(q_tokens.intersection(item.title_key.split()))
+
+    if item.rating:
         score += 0.20
 
-    if item.get("price") is not None:
+    if item.price is not None:
         score += 0.15
 
     return min(score, 1.0)
 
 
-def _filter_price_outliers(items: List[Dict]) -> List[Dict]:
-    prices = [i["price"] for i in items if isinstance(i.get("price"), (int, float))]
+def _filter_price_outliers_np(items: List[Candidate]) -> List[Candidate]:
+    prices = np.fromiter(
+        (i.price if i.price is not None else np.nan for i in items), dtype=np.float64, count=len(items)
+    )
+    missing = np.isnan(prices)
+    known = prices[~missing]
+    if known.size < 3:
+        return items
+
+    median = np.median(known)
+    keep = missing | ((prices >= median * 0.4) & (prices <= median * 2.5))
+    return list(itertools.compress(items, keep.tolist()))
+
+
+def _filter_price_outliers(items: List[Candidate]) -> List[Candidate]:
+    if len(items) > NUMPY_THRESHOLD:
+        return _filter_price_outliers_np(items)
+
+    prices = [i.price for i in items if i.price is not None]
     if len(prices) < 3:
         return items
 
@@ -147,125 +343,192 @@ def _filter_price_outliers(items: List[Dict]) -> List[Dict]:
 
     return [
         i for i in items
-        if i.get("price") is None or (low <= i["price"] <= high)
+        if i.price is None or (low <= i.price <= high)
     ]
 
 
+# Any run of non-alphanumerics (Unicode-aware, so "™", "–" and curly quotes too).
+_NON_ALNUM_RE = re.compile(r"[\W_]+")
+
+
 def _normalize_title_key(title: str) -> str:
-    return "".join(ch.lower() if ch.isalnum() else " " for ch in title).strip()
+    return _NON_ALNUM_RE.sub(" ", title.lower()).strip()
+
+
+def _sort_candidates(items: List[Candidate]) -> List[Candidate]:
+    if len(items) <= NUMPY_THRESHOLD:
+        items.sort(
+            key=lambda c: (
+                -c.score,
+                c.price if c.price is not None else math.inf,
+                -(c.rating or 0.0),
+            )
+        )
+        return items
+
+    n = len(items)
+    scores = np.fromiter((c.score for c in items), dtype=np.float64, count=n)
+    prices = np.fromiter(
+        (c.price if c.price is not None else np.inf for c in items), dtype=np.float64, count=n
+    )
+    ratings = np.fromiter((c.rating or 0.0 for c in items), dtype=np.float64, count=n)
 
+    # lexsort is stable and treats the last key as primary, matching the tuple sort above.
+    order = np.lexsort((-ratings, prices, -scores))
+    return [items[i] for i in order]
 
-def _dedupe(items: List[Dict]) -> List[Dict]:
-    seen = {}
+
+def _dedupe_key(item: Candidate) -> Optional[bytes]:
+    # 8-byte fingerprints keep the dedupe table small; links are canonical
+    # when present, otherwise fall back to the normalized title.
+    text = item.link or item.title_key
+    if not text:
+        return None
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _dedupe_and_rank(items: List[Candidate], max_results: int) -> List[Candidate]:
+    """
+    Collapse duplicates (cheapest, then best-rated, wins), keep the first
+    `max_results` in sorted order and flag the single best of those as
+    recommended.
+    """
+    seen: Dict[bytes, Candidate] = {}
+    seen_get = seen.get
     for item in items:
-        key = item.get("link") or _normalize_title_key(item.get("title") or "")
-        if not key:
+        key = _dedupe_key(item)
+        if key is None:
             continue
 
-        if key not in seen:
+        old = seen_get(key)
+        if old is None:
             seen[key] = item
-        else:
-            old = seen[key]
-            if (
-                item.get("price") is not None
-                and old.get("price") is not None
-                and item["price"] < old["price"]
-            ):
-                seen[key] = item
-            elif (item.get("rating") or 0) > (old.get("rating") or 0):
-                seen[key] = item
-
-    return list(seen.values())
+            continue
 
+        price, old_price = item.price, old.price
+        if price is not None and old_price is not None and price < old_price:
+            seen[key] = item
+        elif (item.rating or 0) > (old.rating or 0):
+            seen[key] = item
 
-def _recommend_best(items: List[Dict]) -> None:
+    # The recommendation is scored over the kept slice only, so it is picked
+    # in the same pass that builds that slice.
+    top: List[Candidate] = []
     best_item = None
     best_score = -1.0
-
-    for item in items:
-        relevance = item.get("_score") or 0
-        rating = (item.get("rating") or 0) / 5
-        trust = _get_trust_score(item.get("source"))
+    for item in itertools.islice(seen.values(), max_results):
+        top.append(item)
 
         final_score = (
-            relevance * 0.45 +
-            rating * 0.25 +
-            trust * 0.30
+            item.score * 0.45 +
+            (item.rating or 0) / 5 * 0.25 +
+            _get_trust_score(item.source) * 0.30
         )
-
         if final_score > best_score:
             best_score = final_score
             best_item = item
 
-    for item in items:
-        item["is_recommended"] = (item is best_item)
+    if best_item is not None:
+        best_item.is_recommended = True
+
+    return top
 
 
 # ------------------------------------------------------------------
 # PUBLIC ENTRYPOINT
 # ------------------------------------------------------------------
 
-def search_all(
+async def _search_uncached(
     query: str,
-    max_results: int = 6,
-    api_key: Optional[str] = None,
-) -> List[Dict]:
+    session: aiohttp.ClientSession,
+    max_results: int,
+    api_key: Optional[str],
+    sources: Iterable[str],
+    cache_key: str,
+) -> SearchResult:
+
+    cached = await _l2_get(cache_key)
+    if cached is not None:
+        return SearchResult(cached)
 
-    cache_key = f"{query}::{max_results}"
-    cached = _cache_get(cache_key)
+    # Near-duplicate queries only share results for the same sources/size.
+    semantic_ns = f"{','.join(sources)}::{max_results}"
+    cached = await semantic_cache.lookup(semantic_ns, query, CACHE_TTL_SECONDS)
     if cached is not None:
-        return cached
+        _CACHE_STATS["semantic_hits"] += 1
+        _CACHE[cache_key] = cached
+        return SearchResult(cached)
 
-    api_key = api_key or os.getenv("SERPAPI_KEY")
+    raw_items, failed = await _fetch_sources(session, query, max_results * 3, sources, api_key)
 
-    try:
-        raw_items = search_google_shopping(
-            api_key=api_key,
-            query=query,
-            max_results=max_results * 3,
-        )
-    except Exception as exc:
-        logger.warning("google shopping failed: %s", exc)
-        return []
+    q_tokens = frozenset(_normalize_title_key(query).split())
 
-    cleaned: List[Dict] = []
+    cleaned: List[Candidate] = []
     for item in raw_items:
-        title = item.get("title")
-        if not title or _is_irrelevant(title):
+        # Lowercase/normalize each title once; filtering, scoring and dedupe all reuse it.
+        item.title_key = _normalize_title_key(item.title)
+        if not item.title_key or _is_irrelevant(item.title_key):
             continue
 
-        item["_score"] = _score_item(item, query)
+        item.score = _score_item(item, q_tokens)
         cleaned.append(item)
 
     cleaned = _filter_price_outliers(cleaned)
 
-    cleaned.sort(
-        key=lambda x: (
-            -(x.get("_score") or 0.0),
-            x.get("price") or math.inf,
-            -(x.get("rating") or 0.0),
-        )
-    )
-
-    cleaned = _dedupe(cleaned)
-    cleaned = cleaned[:max_results]
+    cleaned = _sort_candidates(cleaned)
 
-    _recommend_best(cleaned)
+    cleaned = _dedupe_and_rank(cleaned, max_results)
 
     # 🔗 Smart link handling
     for item in cleaned:
-        link = item.get("link")
-        if link and _is_google_redirect(link):
-            merchant_link = _build_merchant_search_link(item.get("source"), query)
+        if item.link and _is_google_redirect(item.link):
+            merchant_link = _build_merchant_search_link(item.source, query)
             if merchant_link:
-                item["link"] = merchant_link
-                item["link_type"] = "merchant_search"
+                item.link = merchant_link
+                item.link_type = "merchant_search"
             else:
-                item["link_type"] = "google_shopping"
+                item.link_type = "google_shopping"
         else:
-            item["link_type"] = "direct"
+            item.link_type = "direct"
 
-        item.pop("_score", None)
+    # Partial results are not cached so the next request retries the failed source.
+    if not failed:
+        _cache_set(cache_key, cleaned)
+        await semantic_cache.store(semantic_ns, query, cleaned, CACHE_TTL_SECONDS)
+    return SearchResult(cleaned, failed)
+
+
+def _inflight_done(cache_key: str, task: asyncio.Task) -> None:
+    if _INFLIGHT.get(cache_key) is task:
+        del _INFLIGHT[cache_key]
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("search failed for %s: %s", cache_key, task.exception())
+
+
+async def search_all(
+    query: str,
+    session: aiohttp.ClientSession,
+    max_results: int = 6,
+    api_key: Optional[str] = None,
+    sources: Optional[Iterable[str]] = None,
+) -> SearchResult:
+
+    sources = tuple(sources) if sources is not None else _SOURCES_DEFAULT
+    cache_key = f"{query}::{','.join(sources)}::{max_results}"
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return SearchResult(cached)
+
+    task = _INFLIGHT.get(cache_key)
+    if task is None:
+        api_key = api_key or _DEFAULT_API_KEY
+        task = asyncio.create_task(
+            _search_uncached(query, session, max_results, api_key, sources, cache_key)
+        )
+        _INFLIGHT[cache_key] = task
+        task.add_done_callback(lambda t: _inflight_done(cache_key, t))
+    else:
+        _CACHE_STATS["coalesced"] += 1
 
-    _cache_set(cache_key, cleaned)
-    return cleaned
+    # Shielded so a caller timing out does not cancel the fetch other callers share.
+    return await asyncio.shield(task)
@@ -0,0 +1,30 @@
+# backend/app/services/scraper/models.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass(slots=True)
+class Candidate:
+    """A normalized product result as it flows through the search pipeline."""
+
+    title: str
+    source: str
+    price_raw: Optional[str] = None
+    price: Optional[float] = None
+    link: Optional[str] = None
+    image: Optional[str] = None
+    rating: Optional[float] = None
+    # Internal ranking fields; not part of the API response.
+    score: float = 0.0
+    title_key: str = ""
+    is_recommended: bool = False
+    link_type: Optional[str] = None
+
+
+@dataclass(slots=True)
+class SearchResult:
+    products: List[Candidate]
+    # Sources that failed or timed out; non-empty means results may be incomplete.
+    partial_sources: List[str] = field(default_factory=list)
@@ -0,0 +1,140 @@
+# backend/app/services/scraper/semantic_cache.py
+"""
+Second-tier cache for near-duplicate queries.
+
+"iphone 15 pro", "iPhone 15 Pro 256GB" and "apple iphone 15 pro max" all miss
+the exact-key cache but return heavily overlapping results. Here the query is
+embedded with a small local model and matched by cosine distance against
+recently cached queries in an in-memory sqlite-vec table.
+
+Disabled unless ENABLE_SEMANTIC_CACHE is set; requires the optional
+`sentence-transformers` and `sqlite-vec` packages.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import msgspec
+
+from .models import Candidate
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("ENABLE_SEMANTIC_CACHE", "").lower() in ("1", "true", "yes")
+MODEL_NAME = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Cosine distance below which two queries are treated as the same search
+# (similarity > 0.92).
+MAX_DISTANCE = 0.08
+
+# All model and sqlite work runs on one dedicated thread: access to the
+# connection is serialized without a lock, and CPU-bound embedding never
+# queues behind (or blocks) other users of the default executor.
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic-cache")
+_db: Optional[sqlite3.Connection] = None
+_model = None
+# Set once loading fails (missing package, model download error, ...); the
+# cache then stays off for the life of the process instead of retrying the
+# load on every miss.
+_load_failed = False
+
+
+def _ensure_ready() -> Optional[sqlite3.Connection]:
+    global _db, _model, _load_failed
+    if _db is None and not _load_failed:
+        try:
+            import sqlite_vec
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(MODEL_NAME)
+            db = sqlite3.connect(":memory:")
+            db.enable_load_extension(True)
+            sqlite_vec.load(db)
+            db.enable_load_extension(False)
+            db.execute(
+                "CREATE TABLE entries ("
+                " namespace TEXT NOT NULL, query TEXT NOT NULL,"
+                " embedding BLOB NOT NULL, results BLOB NOT NULL, ts REAL NOT NULL)"
+            )
+        except Exception as exc:
+            _load_failed = True
+            logger.error("semantic cache disabled, failed to load: %s", exc)
+            return None
+        _model = model
+        _db = db
+    return _db
+
+
+@functools.lru_cache(maxsize=1024)
+def _embed(query: str) -> bytes:
+    vec = _model.encode(query.lower(), normalize_embeddings=True)
+    return vec.astype("float32").tobytes()
+
+
+def _lookup_sync(namespace: str, query: str, ttl: float) -> Optional[List[Candidate]]:
+    db = _ensure_ready()
+    if db is None:
+        return None
+    row = db.execute(
+        "SELECT results, vec_distance_cosine(embedding, ?) AS distance"
+        " FROM entries WHERE namespace = ? AND ts > ?"
+        " ORDER BY distance LIMIT 1",
+        (_embed(query), namespace, time.time() - ttl),
+    ).fetchone()
+
+    if row is None or row[1] > MAX_DISTANCE:
+        return None
+    return msgspec.json.decode(row[0], type=List[Candidate])
+
+
+def _store_sync(namespace: str, query: str, results: List[Candidate], ttl: float) -> None:
+    now = time.time()
+    db = _ensure_ready()
+    if db is None:
+        return
+    db.execute("DELETE FROM entries WHERE ts <= ?", (now - ttl,))
+    db.execute(
+        "INSERT INTO entries (namespace, query, embedding, results, ts) VALUES (?, ?, ?, ?, ?)",
+        (namespace, query, _embed(query), msgspec.json.encode(results), now),
+    )
+
+
+async def warm_up() -> None:
+    """Loads the model and vector table up front so the first search doesn't pay for it."""
+    if not ENABLED:
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_EXECUTOR, _ensure_ready)
+
+
+async def lookup(namespace: str, query: str, ttl: float) -> Optional[List[Candidate]]:
+    if not ENABLED or _load_failed:
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_EXECUTOR, _lookup_sync, namespace, query, ttl)
+    except Exception as exc:
+        logger.warning("semantic cache lookup failed: %s", exc)
+        return None
+
+
+async def store(namespace: str, query: str, results: List[Candidate], ttl: float) -> None:
+    if not ENABLED or _load_failed:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(_EXECUTOR, _store_sync, namespace, query, results, ttl)
+    except Exception as exc:
+        logger.warning("semantic cache store failed: %s", exc)
+
+
+def close() -> None:
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
@@ -9,8 +9,12 @@ Notes:
   (this ensures the `app` package is importable).
 """
 
+from contextlib import asynccontextmanager
+
+import aiohttp
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import logging
 import os
 
 from dotenv import load_dotenv, find_dotenv
@@ -24,8 +28,33 @@ else:
 
 
 from app.api import product as product_router_module
+from app.services.scraper.google_shopping_scraper import TRACE_CONFIG as SERPAPI_TRACE_CONFIG
+from app.services.scraper.manager import cache_stats, close_cache, warm_cache
+
+logger = logging.getLogger("uvicorn.error")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not os.getenv("SERPAPI_KEY"):
+        # Only /products/mock works without a key; surface this at boot, not on the first search.
+        logger.error("SERPAPI_KEY is not set; product searches will fail")
+
+    # One pooled HTTP session shared by every upstream call (keep-alive, no per-request TLS setup).
+    connector = aiohttp.TCPConnector(limit=50, limit_per_host=20, ttl_dns_cache=300)
+    app.state.http_session = aiohttp.ClientSession(
+        connector=connector,
+        trace_configs=[SERPAPI_TRACE_CONFIG],
+    )
+    try:
+        await warm_cache()
+        yield
+    finally:
+        await app.state.http_session.close()
+        await close_cache()
 
-app = FastAPI(title="Product Search API")
+
+app = FastAPI(title="Product Search API", lifespan=lifespan)
 
 # Minimal CORS for development; tighten in production as needed.
 app.add_middleware(
@@ -50,20 +79,13 @@ def health():
     """
     Simple health check:
     - reports whether SERPAPI_KEY is loaded from environment (or .env),
-    - and whether the optional `serpapi` client package is importable.
+    - whether the shared upstream HTTP session is open,
+    - and search cache hit/miss counters.
     """
-    serpapi_key_present = bool(os.getenv("SERPAPI_KEY"))
-    serpapi_installed = True
-    serpapi_info = "present"
-    try:
-        import serpapi  # type: ignore
-        serpapi_info = getattr(serpapi, "__file__", "module present")
-    except Exception as exc:
-        serpapi_installed = False
-        serpapi_info = str(exc)
+    session = getattr(app.state, "http_session", None)
 
     return {
-        "serpapi_installed": serpapi_installed,
-        "serpapi_info": serpapi_info,
-        "SERPAPI_KEY_loaded": serpapi_key_present,
+        "http_session_open": session is not None and not session.closed,
+        "SERPAPI_KEY_loaded": bool(os.getenv("SERPAPI_KEY")),
+        "cache": cache_stats(),
     }